@@ -8,12 +8,45 @@ A股量化交易Demo
 3. 可视化结果
 """
 
+import functools
+import hashlib
+import json
+import math
+import os
+import tempfile
+from collections import deque
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import matplotlib
+
+# 设置 QUANT_HEADLESS=1 时使用无界面的 Agg 后端，图表直接保存为文件
+HEADLESS = os.environ.get('QUANT_HEADLESS', '') not in ('', '0')
+if HEADLESS:
+    matplotlib.use('Agg')
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+from matplotlib.lines import Line2D
 import akshare as ak
-import talib
+try:
+    import cupy as cp
+except ImportError:  # 没有 CuPy 时多股票批量计算回退到 CPU
+    cp = None
+try:
+    import vector_ta
+except ImportError:  # 没有 vector-ta 时长序列的均线和布林带也走 NumPy 路径
+    vector_ta = None
+try:
+    import xxhash
+except ImportError:  # 没有 xxhash 时用标准库的 blake2b 计算内容哈希
+    xxhash = None
+from numba import njit
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -21,19 +54,579 @@ warnings.filterwarnings('ignore')
 plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
 plt.rcParams['axes.unicode_minus'] = False
 
+# akshare 中文列名到英文列名的映射
+COLUMN_MAPPING = {
+    '开盘': 'Open',
+    '收盘': 'Close', 
+    '最高': 'High',
+    '最低': 'Low',
+    '成交量': 'Volume',
+    '成交额': 'Amount',
+    '振幅': 'Amplitude',
+    '涨跌幅': 'Change_pct',
+    '涨跌额': 'Change_amount',
+    '换手率': 'Turnover'
+}
+
+# 序列超过该长度且安装了 vector-ta 时，均线和布林带改用其 SIMD 内核
+_VECTOR_TA_MIN_BARS = 10000
+
+# 价格图超过该点数时按桶降采样
+_PLOT_MAX_POINTS = 2000
+
+# 行情数据的本地磁盘缓存目录
+CACHE_DIR = Path(os.path.expanduser('~/.cache/ashare'))
+
+
+# 历史数据不会再变的复权方式：不复权与后复权；前复权价格在每次除权除息后整段重算
+_FROZEN_ADJUSTS = ('', 'hfq')
+
+
+def _cache_is_fresh(path, end, max_age, frozen=True):
+    """
+    判断缓存文件是否可直接使用
+    frozen 为真时，在区间结束日之后写入的缓存永久有效（历史数据不会再变），
+    否则（区间包含当天或数据会被重算）超过 max_age 即视为过期
+    """
+    if not path.exists():
+        return False
+    written = datetime.fromtimestamp(path.stat().st_mtime)
+    if frozen and written.strftime('%Y%m%d') > end:
+        return True
+    return max_age is not None and datetime.now() - written < max_age
+
+
+def _atomic_write(path, write):
+    """先写临时文件再替换，避免并发或中断时留下半个缓存文件"""
+    tmp = None
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # 每次写入独占一个临时文件，多线程同时写同一缓存也不会互相覆盖
+        with tempfile.NamedTemporaryFile(dir=CACHE_DIR, prefix=path.name + '.',
+                                         suffix='.tmp', delete=False) as f:
+            tmp = Path(f.name)
+        write(tmp)
+        os.replace(tmp, path)
+    except Exception as e:
+        # 缓存写入失败不影响主流程
+        print(f"写入缓存失败: {e}")
+        if tmp is not None:
+            tmp.unlink(missing_ok=True)
+
+
+def _cached_fetch(symbol, start, end, adjust, max_age=timedelta(hours=1)):
+    """
+    带磁盘缓存的A股日线获取
+    :param symbol: A股代码
+    :param start: 开始日期（YYYYMMDD）
+    :param end: 结束日期（YYYYMMDD）
+    :param adjust: 复权方式
+    :param max_age: 区间包含当天或前复权数据的缓存有效期
+    """
+    path = CACHE_DIR / f'{symbol}_{start}_{end}_{adjust}.parquet'
+    if _cache_is_fresh(path, end, max_age, frozen=adjust in _FROZEN_ADJUSTS):
+        try:
+            return pd.read_parquet(path)
+        except Exception:
+            pass  # 缓存损坏则重新下载
+
+    df = ak.stock_zh_a_hist(symbol=symbol, start_date=start, end_date=end, adjust=adjust)
+    if not df.empty:
+        _atomic_write(path, df.to_parquet)
+    return df
+
+
+class _EmptyFetch(Exception):
+    """空结果不进入进程内缓存，借异常把它带出 lru_cache"""
+
+    def __init__(self, df):
+        super().__init__()
+        self.df = df
+
+
+@functools.lru_cache(maxsize=128)
+def _fetch_history(symbol, start, end, adjust, max_age):
+    """进程内记忆化的历史区间日线获取，空结果不缓存"""
+    df = _cached_fetch(symbol, start, end, adjust, max_age=max_age)
+    if df.empty:
+        raise _EmptyFetch(df)
+    return df
+
+
+def _fetch(symbol, start, end, adjust, max_age=timedelta(hours=1)):
+    """
+    日线获取：已结束且不会被重算（不复权/后复权）的区间在进程内记忆化，
+    同一区间重复获取直接返回内存中的结果；包含当天的区间和前复权数据
+    每次交给磁盘缓存按 max_age 判断是否重新下载
+    返回的 DataFrame 可能被多个调用方共享，调用方不得原地修改
+    """
+    if end >= datetime.now().strftime('%Y%m%d') or adjust not in _FROZEN_ADJUSTS:
+        return _cached_fetch(symbol, start, end, adjust, max_age=max_age)
+    try:
+        return _fetch_history(symbol, start, end, adjust, max_age)
+    except _EmptyFetch as e:
+        return e.df
+
+
+def _cached_stock_info(symbol, max_age=timedelta(hours=1)):
+    """带磁盘缓存的个股信息获取，返回 {item: value} 字典"""
+    path = CACHE_DIR / f'{symbol}_info.json'
+    if _cache_is_fresh(path, datetime.now().strftime('%Y%m%d'), max_age):
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))
+        except Exception:
+            pass
+
+    stock_info = ak.stock_individual_info_em(symbol=symbol)
+    info = dict(zip(stock_info['item'], stock_info['value']))
+    _atomic_write(path, lambda tmp: tmp.write_text(
+        json.dumps(info, ensure_ascii=False, default=str), encoding='utf-8'))
+    return info
+
+
+# RSI/MACD 内核的输出列，顺序与 _rsi_macd 的输出参数一致
+_KERNEL_COLUMNS = (
+    'RSI', 'MACD', 'MACD_Signal', 'MACD_Hist',
+)
+
+
+def _sma_cumsum(x, k):
+    """
+    简单移动平均：前缀和相减，单次遍历且与窗口长度无关
+    前 k-1 个位置为 NaN（同 talib.SMA），输出与输入同精度
+    """
+    # 前缀和用 float64 累加，避免长序列在 float32 下累积误差
+    c = np.empty(x.size + 1)
+    c[0] = 0.0
+    np.cumsum(x, out=c[1:])
+    out = np.full(x.size, np.nan, dtype=x.dtype)
+    out[k - 1:] = (c[k:] - c[:-k]) / k
+    return out
+
+
+@njit(cache=True, nogil=True, fastmath=True)
+def _rolling_minmax(hlc, p):
+    """
+    p日RSV：用单调队列维护滑动窗口的最高价与最低价，整体 O(n)
+    hlc 为最高/最低/收盘价打包成的 (3, n) 数组
+    返回 (收盘 - 最低) / (最高 - 最低) * 100，前 p-1 个位置为 NaN
+    """
+    n = hlc.shape[1]
+    out = np.empty(n, hlc.dtype)
+    # 环形缓冲区存下标：max_q 对应的最高价单调递减，min_q 对应的最低价单调递增
+    max_q = np.empty(p, np.int64)
+    min_q = np.empty(p, np.int64)
+    max_head = max_len = 0
+    min_head = min_len = 0
+
+    for i in range(n):
+        # 队首下标滑出窗口
+        if max_len > 0 and max_q[max_head] <= i - p:
+            max_head = (max_head + 1) % p
+            max_len -= 1
+        if min_len > 0 and min_q[min_head] <= i - p:
+            min_head = (min_head + 1) % p
+            min_len -= 1
+
+        # 新值入队前弹出被它支配的队尾
+        while max_len > 0 and hlc[0, max_q[(max_head + max_len - 1) % p]] <= hlc[0, i]:
+            max_len -= 1
+        max_q[(max_head + max_len) % p] = i
+        max_len += 1
+        while min_len > 0 and hlc[1, min_q[(min_head + min_len - 1) % p]] >= hlc[1, i]:
+            min_len -= 1
+        min_q[(min_head + min_len) % p] = i
+        min_len += 1
+
+        if i >= p - 1:
+            hh = hlc[0, max_q[max_head]]
+            ll = hlc[1, min_q[min_head]]
+            rng = hh - ll
+            out[i] = (hlc[2, i] - ll) / rng * 100.0 if rng != 0.0 else 0.0
+        else:
+            out[i] = np.nan
+    return out
+
+
+@njit(cache=True, nogil=True, fastmath=True)
+def _rsi_macd(close, out_rsi, out_macd, out_sig, out_hist):
+    """
+    单次遍历计算 RSI(14) 与 MACD(12,26,9)，结果与 talib 默认参数一致
+    结果写入预分配的输出数组，窗口未满的位置为 NaN
+    输入输出可为 float32，标量累加器保持 float64
+    """
+    n = close.shape[0]
+    nan = np.nan
+    avg_gain = avg_loss = 0.0
+    ema12 = ema26 = sig = macd_sum = macd = 0.0
+
+    for i in range(n):
+        c = np.float64(close[i])
+
+        # RSI：前14个涨跌的均值作为初值，之后Wilder平滑
+        if i >= 1:
+            diff = c - close[i - 1]
+            gain = diff if diff > 0.0 else 0.0
+            loss = -diff if diff < 0.0 else 0.0
+            if i <= 14:
+                avg_gain += gain
+                avg_loss += loss
+                if i == 14:
+                    avg_gain /= 14.0
+                    avg_loss /= 14.0
+            else:
+                avg_gain = (avg_gain * 13.0 + gain) / 14.0
+                avg_loss = (avg_loss * 13.0 + loss) / 14.0
+        if i >= 14:
+            total = avg_gain + avg_loss
+            out_rsi[i] = 100.0 * avg_gain / total if total != 0.0 else 0.0
+        else:
+            out_rsi[i] = nan
+
+        # MACD：两条EMA在第26根对齐，以各自的简单均值为初值（同 talib）
+        if i == 25:
+            ema12 = 0.0
+            for j in range(14, 26):
+                ema12 += close[j]
+            ema12 /= 12.0
+            ema26 = 0.0
+            for j in range(26):
+                ema26 += close[j]
+            ema26 /= 26.0
+        elif i > 25:
+            ema12 += (c - ema12) * (2.0 / 13.0)
+            ema26 += (c - ema26) * (2.0 / 27.0)
+        if i >= 25:
+            macd = ema12 - ema26
+            if i < 33:
+                macd_sum += macd
+            elif i == 33:
+                sig = (macd_sum + macd) / 9.0
+            else:
+                sig += (macd - sig) * (2.0 / 10.0)
+        if i >= 33:
+            out_macd[i] = macd
+            out_sig[i] = sig
+            out_hist[i] = macd - sig
+        else:
+            out_macd[i] = nan
+            out_sig[i] = nan
+            out_hist[i] = nan
+
+
+def _warmup_kernels(n=256):
+    """用全零样本触发 Numba 编译，配合 cache=True 之后的进程直接加载磁盘缓存"""
+    hlc = np.zeros((3, n), dtype=np.float32)
+    _rsi_macd(hlc[2], *[np.empty(n, dtype=np.float32) for _ in _KERNEL_COLUMNS])
+    _rolling_minmax(hlc, 9)
+
+
+def _compute_indicators(hlc):
+    """
+    计算单只股票的全部技术指标
+    hlc 为最高/最低/收盘价打包成的 (3, n) float32 数组，所有指标共用这一块内存
+    返回 {列名: 指标数组}
+    """
+    close = hlc[2]
+    n = len(close)
+
+    if vector_ta is not None and n > _VECTOR_TA_MIN_BARS:
+        # vector-ta 的 Rust 内核在运行时按 CPU 选择 AVX2/AVX-512 实现，只接受 float64
+        close_f64 = close.astype(np.float64)
+        indicators = {f'MA{period}': vector_ta.sma(close_f64, period).astype(np.float32)
+                      for period in (5, 10, 20, 60)}
+        upper, _, lower = vector_ta.bollinger_bands(close_f64, 20, 2.0, 2.0, 'sma', 0)
+        mid = indicators['MA20']
+        upper = upper.astype(np.float32)
+        lower = lower.astype(np.float32)
+    else:
+        # 移动平均线
+        indicators = {f'MA{period}': _sma_cumsum(close, period) for period in (5, 10, 20, 60)}
+
+        # 布林带：中轨复用 MA20，标准差直接在20日滑动窗口视图上求（总体标准差，同 talib）
+        mid = indicators['MA20']
+        upper = np.full(n, np.nan, dtype=np.float32)
+        lower = np.full(n, np.nan, dtype=np.float32)
+        if n >= 20:
+            std = sliding_window_view(close, 20).std(axis=1, dtype=np.float64)
+            upper[19:] = mid[19:] + 2 * std
+            lower[19:] = mid[19:] - 2 * std
+    indicators['BB_Upper'] = upper
+    indicators['BB_Middle'] = mid
+    indicators['BB_Lower'] = lower
+
+    # RSI、MACD 依赖递推，单次遍历计算，结果写入预分配数组
+    outputs = [np.empty(n, dtype=np.float32) for _ in _KERNEL_COLUMNS]
+    _rsi_macd(close, *outputs)
+    indicators.update(zip(_KERNEL_COLUMNS, outputs))
+
+    # KDJ指标：K为9日RSV的3日均值，D为K的3日均值
+    rsv = _rolling_minmax(hlc, 9)
+    k = np.full(n, np.nan, dtype=np.float32)
+    d = np.full(n, np.nan, dtype=np.float32)
+    k[8:] = _sma_cumsum(rsv[8:], 3)
+    d[10:] = _sma_cumsum(k[10:], 3)
+    k[:12] = np.nan  # 与 talib.STOCH 一致，K 与 D 同时开始输出
+    indicators['K'] = k
+    indicators['D'] = d
+    indicators['J'] = 3 * k - 2 * d
+    return indicators
+
+
+# GPU 上的 RSI/MACD 递推：每个线程负责一只股票，数据按 (交易日, 股票) 排列，
+# 同一时刻相邻线程读取相邻地址；算法与 _rsi_macd 一致
+_RSI_MACD_CUDA = r"""
+extern "C" __global__
+void rsi_macd(const float* close, const int* start, const int n_rows, const int n,
+              float* out_rsi, float* out_macd, float* out_sig, float* out_hist)
+{
+    const int row = blockDim.x * blockIdx.x + threadIdx.x;
+    if (row >= n_rows) return;
+    const float nan = __int_as_float(0x7fffffff);
+    const int s = start[row];  // 该股票第一根有效K线，之前为上市前的空白
+    double avg_gain = 0.0, avg_loss = 0.0;
+    double ema12 = 0.0, ema26 = 0.0, sig = 0.0, macd_sum = 0.0, macd = 0.0;
+
+    for (int i = 0; i < n; ++i) {
+        const long long at = (long long)i * n_rows + row;
+        const int t = i - s;  // 自上市起的第几根K线
+        if (t < 0) {
+            out_rsi[at] = nan;
+            out_macd[at] = nan;
+            out_sig[at] = nan;
+            out_hist[at] = nan;
+            continue;
+        }
+        const double c = close[at];
+
+        if (t >= 1) {
+            const double diff = c - close[at - n_rows];
+            const double gain = diff > 0.0 ? diff : 0.0;
+            const double loss = diff < 0.0 ? -diff : 0.0;
+            if (t <= 14) {
+                avg_gain += gain;
+                avg_loss += loss;
+                if (t == 14) {
+                    avg_gain /= 14.0;
+                    avg_loss /= 14.0;
+                }
+            } else {
+                avg_gain = (avg_gain * 13.0 + gain) / 14.0;
+                avg_loss = (avg_loss * 13.0 + loss) / 14.0;
+            }
+        }
+        if (t >= 14) {
+            const double total = avg_gain + avg_loss;
+            out_rsi[at] = total != 0.0 ? 100.0 * avg_gain / total : 0.0;
+        } else {
+            out_rsi[at] = nan;
+        }
+
+        if (t == 25) {
+            ema12 = 0.0;
+            for (int j = s + 14; j < s + 26; ++j) ema12 += close[(long long)j * n_rows + row];
+            ema12 /= 12.0;
+            ema26 = 0.0;
+            for (int j = s; j < s + 26; ++j) ema26 += close[(long long)j * n_rows + row];
+            ema26 /= 26.0;
+        } else if (t > 25) {
+            ema12 += (c - ema12) * (2.0 / 13.0);
+            ema26 += (c - ema26) * (2.0 / 27.0);
+        }
+        if (t >= 25) {
+            macd = ema12 - ema26;
+            if (t < 33) {
+                macd_sum += macd;
+            } else if (t == 33) {
+                sig = (macd_sum + macd) / 9.0;
+            } else {
+                sig += (macd - sig) * (2.0 / 10.0);
+            }
+        }
+        if (t >= 33) {
+            out_macd[at] = macd;
+            out_sig[at] = sig;
+            out_hist[at] = macd - sig;
+        } else {
+            out_macd[at] = nan;
+            out_sig[at] = nan;
+            out_hist[at] = nan;
+        }
+    }
+}
+"""
+
+
+def _gpu_available():
+    """CuPy 已安装且有可用的 CUDA 设备"""
+    if cp is None:
+        return False
+    try:
+        return cp.cuda.runtime.getDeviceCount() > 0
+    except Exception:
+        return False
+
+
+@functools.lru_cache(maxsize=None)
+def _rsi_macd_gpu_kernel():
+    return cp.RawKernel(_RSI_MACD_CUDA, 'rsi_macd')
+
+
+def _rsi_macd_gpu(close, start):
+    """
+    在 GPU 上按股票并行计算 RSI 与 MACD
+    close 为 (股票数, 交易日) 的 float32 数组，start 为每只股票第一根有效K线的位置
+    """
+    n_rows, n = close.shape
+    src = cp.ascontiguousarray(close.T)
+    outputs = [cp.empty_like(src) for _ in _KERNEL_COLUMNS]
+    threads = 128
+    _rsi_macd_gpu_kernel()(((n_rows + threads - 1) // threads,), (threads,),
+                           (src, cp.asarray(start, dtype=cp.int32), np.int32(n_rows), np.int32(n),
+                            *outputs))
+    return dict(zip(_KERNEL_COLUMNS, (out.T for out in outputs)))
+
+
+def _sma_rows_gpu(x, k, t, power=1):
+    """
+    按行计算滑动均值（power=2 时为平方的均值），前缀和用 float64 累加
+    t 为每个位置自该股票上市起的K线序号，窗口未满（t < k-1）的位置为 NaN；
+    x 在 t < 0 的位置须已填充为有限值，以免 NaN 沿前缀和传播
+    """
+    n_rows, n = x.shape
+    c = cp.zeros((n_rows, n + 1), dtype=cp.float64)
+    c[:, 1:] = cp.cumsum(x.astype(cp.float64) ** power, axis=1)
+    out = cp.full((n_rows, n), np.nan, dtype=cp.float64)
+    out[:, k - 1:] = (c[:, k:] - c[:, :-k]) / k
+    return cp.where(t >= k - 1, out, np.nan)
+
+
+def _batch_indicators_gpu(close, high, low, start):
+    """
+    在 GPU 上批量计算全部指标，输入为 (股票数, 交易日) 的 float32 CuPy 数组，
+    start 为每只股票第一根有效K线的位置（之前为上市前的 NaN）
+    每只股票从自己的第一根K线起算，结果与单只股票的 _compute_indicators 一致，
+    返回 {列名: CuPy 数组}
+    """
+    n_rows, n = close.shape
+    start = cp.asarray(start, dtype=cp.int32)
+    t = cp.arange(n)[None, :] - start[:, None]
+    # 上市前的空白填 0，保证前缀和与错位极值不被 NaN 污染，对应输出最后统一置为 NaN
+    close, high, low = (cp.where(t >= 0, x, 0).astype(cp.float32) for x in (close, high, low))
+
+    indicators = {f'MA{period}': _sma_rows_gpu(close, period, t).astype(cp.float32)
+                  for period in (5, 10, 20, 60)}
+
+    # 布林带：中轨复用 MA20，方差由均值与平方均值求得
+    mid = _sma_rows_gpu(close, 20, t)
+    std = cp.sqrt(cp.maximum(_sma_rows_gpu(close, 20, t, power=2) - mid * mid, 0.0))
+    indicators['BB_Upper'] = (mid + 2 * std).astype(cp.float32)
+    indicators['BB_Middle'] = indicators['MA20']
+    indicators['BB_Lower'] = (mid - 2 * std).astype(cp.float32)
+
+    indicators.update(_rsi_macd_gpu(close, start))
+
+    # KDJ：9日最高/最低价由9个错位切片逐元素取极值得到
+    rsv = cp.zeros((n_rows, n), dtype=cp.float32)
+    if n >= 9:
+        hh = high[:, 8:].copy()
+        ll = low[:, 8:].copy()
+        for j in range(1, 9):
+            cp.maximum(hh, high[:, 8 - j:n - j], out=hh)
+            cp.minimum(ll, low[:, 8 - j:n - j], out=ll)
+        rng = hh - ll
+        rsv[:, 8:] = cp.where(rng != 0, (close[:, 8:] - ll) / cp.where(rng != 0, rng, 1) * 100, 0)
+    rsv = cp.where(t >= 8, rsv, 0)
+    k = cp.nan_to_num(_sma_rows_gpu(rsv, 3, t - 8)).astype(cp.float32)
+    d = _sma_rows_gpu(k, 3, t - 10).astype(cp.float32)
+    k = cp.where(t >= 12, k, np.nan)  # 与 talib.STOCH 一致，K 与 D 同时开始输出
+    indicators['K'] = k
+    indicators['D'] = d
+    indicators['J'] = 3 * k - 2 * d
+    return indicators
+
+
+class _HashedPrices:
+    """按内容哈希比较的价格数组包装，使其可以作为 lru_cache 的参数"""
+    __slots__ = ('array', 'key')
+
+    def __init__(self, array):
+        self.array = array
+        buf = memoryview(np.ascontiguousarray(array)).cast('B')
+        digest = xxhash.xxh64(buf).hexdigest() if xxhash is not None \
+            else hashlib.blake2b(buf, digest_size=16).hexdigest()
+        self.key = (array.shape, digest)
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        return isinstance(other, _HashedPrices) and self.key == other.key
+
+
+@functools.lru_cache(maxsize=32)
+def _indicators_cached(prices):
+    """
+    按价格内容记忆化的指标计算，同一份数据重复分析时直接返回上次的结果
+    返回的数组被缓存共享，调用方不得原地修改
+    """
+    return _compute_indicators(prices.array)
+
+
+def _minmax_downsample(x, y, buckets):
+    """
+    按桶降采样：每个桶保留最低点和最高点（按时间先后），保证上下影线仍然可见
+    返回约 2*buckets 个点；窗口未满的 NaN 保留为断点
+    """
+    n = len(y)
+    size = n // buckets
+    if size < 2:
+        return x, y
+    m = n // size * size
+    yb = y[:m].reshape(-1, size)
+    base = np.arange(0, m, size)
+    i_min = np.argmin(np.where(np.isnan(yb), np.inf, yb), axis=1) + base
+    i_max = np.argmax(np.where(np.isnan(yb), -np.inf, yb), axis=1) + base
+    idx = np.unique(np.concatenate([i_min, i_max, np.arange(m, n)]))
+    return x[idx], y[idx]
+
+
+def _envelope_downsample(x, upper, lower, buckets):
+    """
+    按桶取上轨最大值、下轨最小值，用于降采样后的布林带填充
+    每个桶在首尾两个时间点各取一次包络，末尾不足一桶的K线单独成桶，与价格线覆盖同样的区间
+    """
+    n = len(x)
+    size = n // buckets
+    if size < 2:
+        return x, upper, lower
+    starts = np.arange(0, n, size)
+    ends = np.append(starts[1:], n) - 1
+    return (np.column_stack([x[starts], x[ends]]).ravel(),
+            np.repeat(np.fmax.reduceat(upper, starts), 2),
+            np.repeat(np.fmin.reduceat(lower, starts), 2))
+
+
 class AShareQuantStrategy:
-    def __init__(self, symbol='600519', start_date=None, end_date=None):
+    def __init__(self, symbol='600519', start_date=None, end_date=None,
+                 cache_max_age=timedelta(hours=1), warmup=False):
         """
         初始化A股策略
         :param symbol: A股代码（如：'600519' 贵州茅台）
         :param start_date: 开始日期
         :param end_date: 结束日期
+        :param cache_max_age: 行情缓存的有效期；前复权价格会随除权除息整段重算，
+                              因此即使是历史区间也按该有效期重新获取
+        :param warmup: 是否在初始化时预先编译指标内核，避免首次计算时的JIT延迟
         """
         self.symbol = symbol
         self.start_date = start_date or (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
         self.end_date = end_date or datetime.now().strftime('%Y-%m-%d')
         self.data = None
         self.stock_name = None
+        self.cache_max_age = cache_max_age
+        if warmup:
+            _warmup_kernels()
         
     def fetch_data(self):
         """获取A股股票数据"""
@@ -43,40 +636,32 @@ class AShareQuantStrategy:
             start_date_format = self.start_date.replace('-', '')
             end_date_format = self.end_date.replace('-', '')
             
-            self.data = ak.stock_zh_a_hist(
-                symbol=self.symbol, 
-                start_date=start_date_format, 
-                end_date=end_date_format, 
-                adjust="qfq"  # 前复权
-            )
+            # 结果为共享的缓存对象，浅拷贝后再处理
+            self.data = _fetch(
+                self.symbol, 
+                start_date_format, 
+                end_date_format, 
+                "qfq",  # 前复权
+                max_age=self.cache_max_age
+            ).copy(deep=False)
             
             if self.data.empty:
                 print("获取的数据为空，请检查股票代码或日期范围")
                 return False
                 
             # 设置日期为索引
-            self.data['日期'] = pd.to_datetime(self.data['日期'])
-            self.data.set_index('日期', inplace=True)
+            idx = pd.DatetimeIndex(pd.to_datetime(self.data['日期'].values), name='日期')
+            self.data = self.data.drop(columns='日期')
+            self.data.index = idx
             
-            # 重命名列名为英文，方便后续处理
-            column_mapping = {
-                '开盘': 'Open',
-                '收盘': 'Close', 
-                '最高': 'High',
-                '最低': 'Low',
-                '成交量': 'Volume',
-                '成交额': 'Amount',
-                '振幅': 'Amplitude',
-                '涨跌幅': 'Change_pct',
-                '涨跌额': 'Change_amount',
-                '换手率': 'Turnover'
-            }
-            self.data.rename(columns=column_mapping, inplace=True)
+            # 重命名列名为英文，方便后续处理（只映射实际存在的列）
+            mapping = {k: v for k, v in COLUMN_MAPPING.items() if k in self.data.columns}
+            self.data = self.data.rename(columns=mapping)
             
             # 获取股票名称
             try:
-                stock_info = ak.stock_individual_info_em(symbol=self.symbol)
-                self.stock_name = stock_info[stock_info['item'] == '股票简称']['value'].iloc[0]
+                stock_info = _cached_stock_info(self.symbol, max_age=self.cache_max_age)
+                self.stock_name = stock_info['股票简称']
             except:
                 self.stock_name = self.symbol
                 
@@ -94,59 +679,65 @@ class AShareQuantStrategy:
             print("请先获取数据")
             return
             
-        # 移动平均线
-        self.data['MA5'] = talib.SMA(self.data['Close'].values, timeperiod=5)
-        self.data['MA10'] = talib.SMA(self.data['Close'].values, timeperiod=10)
-        self.data['MA20'] = talib.SMA(self.data['Close'].values, timeperiod=20)
-        self.data['MA60'] = talib.SMA(self.data['Close'].values, timeperiod=60)
-        
-        # RSI
-        self.data['RSI'] = talib.RSI(self.data['Close'].values, timeperiod=14)
-        
-        # MACD
-        macd, macdsignal, macdhist = talib.MACD(self.data['Close'].values)
-        self.data['MACD'] = macd
-        self.data['MACD_Signal'] = macdsignal
-        self.data['MACD_Hist'] = macdhist
-        
-        # 布林带
-        upper, middle, lower = talib.BBANDS(self.data['Close'].values, timeperiod=20)
-        self.data['BB_Upper'] = upper
-        self.data['BB_Middle'] = middle
-        self.data['BB_Lower'] = lower
-        
-        # KDJ指标
-        high = self.data['High'].values
-        low = self.data['Low'].values 
-        close = self.data['Close'].values
-        
-        k, d = talib.STOCH(high, low, close, fastk_period=9, slowk_period=3, slowd_period=3)
-        self.data['K'] = k
-        self.data['D'] = d
-        self.data['J'] = 3 * k - 2 * d
+        # 价格只有2~4位小数，指标用 float32 计算，内存带宽减半；
+        # 最高/最低/收盘价只转换一次，打包进同一块连续内存，后续所有指标内核共用
+        hlc = np.empty((3, len(self.data)), dtype=np.float32)
+        hlc[0] = self.data['High'].to_numpy()
+        hlc[1] = self.data['Low'].to_numpy()
+        hlc[2] = self.data['Close'].to_numpy()
+        assert hlc.flags['C_CONTIGUOUS']
+
+        indicators = _indicators_cached(_HashedPrices(hlc))
+
+        # 一次性拼接所有指标列，避免逐列赋值反复整理内部数据块；
+        # 指标数组归缓存所有，这里拷贝一份，避免修改 self.data 时污染缓存
+        new = pd.DataFrame(indicators, index=self.data.index, copy=True)
+        self.data = pd.concat([self.data.drop(columns=new.columns, errors='ignore'), new], axis=1)
         
         print("技术指标计算完成")
     
-    def plot_results(self):
-        """可视化结果"""
+    def plot_results(self, save_path=None):
+        """
+        可视化结果
+        :param save_path: 图片保存路径，指定时保存后关闭图像，不弹出窗口
+        """
         if self.data is None:
             return
             
         fig, axes = plt.subplots(4, 1, figsize=(15, 12))
         
-        # 价格和移动平均线
-        axes[0].plot(self.data.index, self.data['Close'], label='收盘价', linewidth=1.5, color='black')
-        axes[0].plot(self.data.index, self.data['MA5'], label='MA5', alpha=0.8, color='red')
-        axes[0].plot(self.data.index, self.data['MA10'], label='MA10', alpha=0.8, color='orange')
-        axes[0].plot(self.data.index, self.data['MA20'], label='MA20', alpha=0.8, color='blue')
-        axes[0].plot(self.data.index, self.data['MA60'], label='MA60', alpha=0.8, color='green')
+        # 价格和移动平均线：合并为一个 LineCollection，点数过多时降采样
+        x = mdates.date2num(self.data.index)
+        buckets = _PLOT_MAX_POINTS // 2 if len(x) > _PLOT_MAX_POINTS else len(x)
+        price_lines = [
+            ('Close', '收盘价', 'black', 1.5, 1.0),
+            ('MA5', 'MA5', 'red', 1.0, 0.8),
+            ('MA10', 'MA10', 'orange', 1.0, 0.8),
+            ('MA20', 'MA20', 'blue', 1.0, 0.8),
+            ('MA60', 'MA60', 'green', 1.0, 0.8),
+        ]
+        segments = []
+        handles = []
+        for column, label, color, width, alpha in price_lines:
+            xs, ys = _minmax_downsample(x, self.data[column].to_numpy(dtype=float), buckets)
+            segments.append(np.column_stack([xs, ys]))
+            handles.append(Line2D([], [], color=color, linewidth=width, alpha=alpha, label=label))
+        axes[0].add_collection(LineCollection(
+            segments,
+            colors=[to_rgba(color, alpha) for _, _, color, _, alpha in price_lines],
+            linewidths=[width for _, _, _, width, _ in price_lines],
+        ))
+        axes[0].xaxis_date()
+        axes[0].autoscale_view()
         
         # 布林带
-        axes[0].fill_between(self.data.index, self.data['BB_Upper'], self.data['BB_Lower'], 
-                           alpha=0.1, color='gray', label='布林带')
+        bx, upper, lower = _envelope_downsample(
+            x, self.data['BB_Upper'].to_numpy(dtype=float),
+            self.data['BB_Lower'].to_numpy(dtype=float), buckets)
+        handles.append(axes[0].fill_between(bx, upper, lower, alpha=0.1, color='gray', label='布林带'))
         
         axes[0].set_title(f'{self.stock_name}({self.symbol}) 价格走势和移动平均线', fontsize=14)
-        axes[0].legend()
+        axes[0].legend(handles=handles)
         axes[0].grid(True, alpha=0.3)
         
         # RSI
@@ -164,8 +755,9 @@ class AShareQuantStrategy:
         axes[2].plot(self.data.index, self.data['MACD_Signal'], label='信号线', color='red', linewidth=1.5)
         
         # MACD柱状图
-        colors = ['red' if x > 0 else 'green' for x in self.data['MACD_Hist']]
-        axes[2].bar(self.data.index, self.data['MACD_Hist'], color=colors, alpha=0.6, label='MACD柱')
+        hist = self.data['MACD_Hist'].to_numpy()
+        colors = np.where(hist > 0, 'red', 'green')
+        axes[2].vlines(self.data.index, 0, hist, colors=colors, linewidth=2, alpha=0.6, label='MACD柱')
         
         axes[2].axhline(y=0, color='black', linestyle='-', alpha=0.3)
         axes[2].set_title('MACD指标', fontsize=12)
@@ -184,66 +776,316 @@ class AShareQuantStrategy:
         axes[3].set_ylim(0, 100)
         
         plt.tight_layout()
-        plt.show()
+        if save_path:
+            fig.savefig(save_path, dpi=100, bbox_inches='tight')
+            plt.close(fig)
+        else:
+            plt.show()
     
     def show_data_summary(self):
         """显示数据摘要"""
         if self.data is None:
             return
             
+        # 最新一行一次性转为字典，避免逐个字段走 Series 标签索引
+        last = self.data.iloc[-1].to_dict()
+        last_date = self.data.index[-1].strftime('%Y-%m-%d')
+        
         print(f"\n=== {self.stock_name}({self.symbol}) 数据摘要 ===")
-        print(f"数据时间范围: {self.data.index[0].strftime('%Y-%m-%d')} 到 {self.data.index[-1].strftime('%Y-%m-%d')}")
+        print(f"数据时间范围: {self.data.index[0].strftime('%Y-%m-%d')} 到 {last_date}")
         print(f"总交易日数: {len(self.data)} 天")
         
-        latest = self.data.iloc[-1]
-        print(f"\n最新数据 ({self.data.index[-1].strftime('%Y-%m-%d')}):")
-        print(f"收盘价: {latest['Close']:.2f}")
-        print(f"涨跌幅: {latest['Change_pct']:.2f}%")
-        print(f"成交量: {latest['Volume']:,}")
+        print(f"\n最新数据 ({last_date}):")
+        print(f"收盘价: {last['Close']:.2f}")
+        print(f"涨跌幅: {last['Change_pct']:.2f}%")
+        print(f"成交量: {last['Volume']:,}")
         
         print(f"\n技术指标:")
-        print(f"MA5: {latest['MA5']:.2f}")
-        print(f"MA20: {latest['MA20']:.2f}")
-        print(f"RSI: {latest['RSI']:.2f}")
-        print(f"MACD: {latest['MACD']:.4f}")
+        print(f"MA5: {last['MA5']:.2f}")
+        print(f"MA20: {last['MA20']:.2f}")
+        print(f"RSI: {last['RSI']:.2f}")
+        print(f"MACD: {last['MACD']:.4f}")
         
         # 简单的技术分析提示
         print(f"\n简单技术分析:")
-        if latest['Close'] > latest['MA5'] > latest['MA20']:
+        if last['Close'] > last['MA5'] > last['MA20']:
             print("• 价格位于均线之上，短期趋势向上")
-        elif latest['Close'] < latest['MA5'] < latest['MA20']:
+        elif last['Close'] < last['MA5'] < last['MA20']:
             print("• 价格位于均线之下，短期趋势向下")
         else:
             print("• 价格与均线交织，趋势不明")
             
-        if latest['RSI'] > 70:
+        if last['RSI'] > 70:
             print("• RSI超买，注意回调风险")
-        elif latest['RSI'] < 30:
+        elif last['RSI'] < 30:
             print("• RSI超卖，可能有反弹机会")
         else:
-            print(f"• RSI在正常区间({latest['RSI']:.1f})")
+            print(f"• RSI在正常区间({last['RSI']:.1f})")
     
-    def run_analysis(self):
-        """运行完整分析"""
-        print("=== A股量化分析开始 ===")
-        
+    def run_analysis(self, save_path=None):
+        """
+        运行完整分析
+        :param save_path: 图片保存路径，无界面模式下默认保存为 <股票代码>.png
+        """
         # 1. 获取数据
         if not self.fetch_data():
             return None
-            
+        
+        return self.analyze(save_path=save_path)
+    
+    def analyze(self, plot=True, save_path=None):
+        """
+        对已获取的数据计算指标、显示摘要并可视化
+        :param plot: 是否绘图
+        :param save_path: 图片保存路径，无界面模式下默认保存为 <股票代码>.png
+        """
+        print(f"=== {self.stock_name}({self.symbol}) 量化分析开始 ===")
+        
         # 2. 计算指标
         self.calculate_indicators()
         
         # 3. 显示摘要
         self.show_data_summary()
         
-        # 4. 可视化
-        self.plot_results()
+        # 4. 可视化（无界面模式下 plt.show 不会输出任何内容，改为保存并关闭图像）
+        if plot:
+            if save_path is None and HEADLESS:
+                save_path = f'{self.symbol}.png'
+            self.plot_results(save_path=save_path)
         
         print("分析完成！")
         return self.data
 
 
+class StreamingIndicators:
+    def __init__(self):
+        """
+        逐根K线增量更新的技术指标，用于实盘推送等场景
+        每次 update 只加入最新一根、剔除最旧一根，复杂度 O(1)，已处理的K线不再重算；
+        计算口径与 calculate_indicators 一致，窗口未满的指标为 NaN
+        """
+        self.count = 0
+        self.prev_close = None
+        
+        # 移动平均线与布林带：固定长度窗口与滑动累加和
+        self.buf5 = deque(maxlen=5)
+        self.buf10 = deque(maxlen=10)
+        self.buf20 = deque(maxlen=20)
+        self.buf60 = deque(maxlen=60)
+        self.s5 = self.s10 = self.s20 = self.s60 = 0.0
+        self.sq20 = 0.0
+        
+        # RSI：Wilder 平滑的平均涨幅/跌幅
+        self.avg_gain = self.avg_loss = 0.0
+        
+        # MACD：快慢线 EMA 与信号线 EMA
+        self.ema12 = self.ema26 = self.ema9_sig = 0.0
+        self.macd_sum = 0.0
+        
+        # KDJ：(序号, 价格) 单调队列维护9日最高/最低价，以及最近3个 RSV 和 K
+        self.hi_deque = deque()
+        self.lo_deque = deque()
+        self.rsv_buf = deque(maxlen=3)
+        self.k_buf = deque(maxlen=3)
+    
+    @staticmethod
+    def _slide(buf, total, value):
+        """窗口已满时先减去将被挤出的最旧值，再加入新值"""
+        if len(buf) == buf.maxlen:
+            total -= buf[0]
+        buf.append(value)
+        return total + value
+    
+    def update(self, open_, high, low, close):
+        """
+        推入一根新K线，返回最新一根的全部指标
+        :param open_: 开盘价（当前指标不使用，保留以便直接传入OHLC）
+        :param high: 最高价
+        :param low: 最低价
+        :param close: 收盘价
+        :return: {列名: 指标值}
+        """
+        i = self.count
+        nan = math.nan
+        out = {}
+        
+        # 移动平均线
+        if len(self.buf20) == 20:
+            self.sq20 -= self.buf20[0] ** 2
+        self.sq20 += close * close
+        self.s5 = self._slide(self.buf5, self.s5, close)
+        self.s10 = self._slide(self.buf10, self.s10, close)
+        self.s20 = self._slide(self.buf20, self.s20, close)
+        self.s60 = self._slide(self.buf60, self.s60, close)
+        out['MA5'] = self.s5 / 5 if i >= 4 else nan
+        out['MA10'] = self.s10 / 10 if i >= 9 else nan
+        out['MA20'] = self.s20 / 20 if i >= 19 else nan
+        out['MA60'] = self.s60 / 60 if i >= 59 else nan
+        
+        # 布林带
+        mid = out['MA20']
+        std = math.sqrt(max(self.sq20 / 20 - mid * mid, 0.0)) if i >= 19 else nan
+        out['BB_Upper'] = mid + 2 * std
+        out['BB_Middle'] = mid
+        out['BB_Lower'] = mid - 2 * std
+        
+        # RSI：前14个涨跌的均值作为初值，之后Wilder平滑
+        if i >= 1:
+            diff = close - self.prev_close
+            gain = max(diff, 0.0)
+            loss = max(-diff, 0.0)
+            if i <= 14:
+                self.avg_gain += gain
+                self.avg_loss += loss
+                if i == 14:
+                    self.avg_gain /= 14
+                    self.avg_loss /= 14
+            else:
+                self.avg_gain = (self.avg_gain * 13 + gain) / 14
+                self.avg_loss = (self.avg_loss * 13 + loss) / 14
+        if i >= 14:
+            total = self.avg_gain + self.avg_loss
+            out['RSI'] = 100 * self.avg_gain / total if total != 0 else 0.0
+        else:
+            out['RSI'] = nan
+        
+        # MACD：两条EMA在第26根以简单均值为初值，之后逐根递推
+        macd = nan
+        if i == 25:
+            self.ema12 = sum(list(self.buf60)[-12:]) / 12
+            self.ema26 = self.s60 / 26
+        elif i > 25:
+            self.ema12 += (close - self.ema12) * (2 / 13)
+            self.ema26 += (close - self.ema26) * (2 / 27)
+        if i >= 25:
+            macd = self.ema12 - self.ema26
+            if i < 33:
+                self.macd_sum += macd
+            elif i == 33:
+                self.ema9_sig = (self.macd_sum + macd) / 9
+            else:
+                self.ema9_sig += (macd - self.ema9_sig) * (2 / 10)
+        if i >= 33:
+            out['MACD'] = macd
+            out['MACD_Signal'] = self.ema9_sig
+            out['MACD_Hist'] = macd - self.ema9_sig
+        else:
+            out['MACD'] = out['MACD_Signal'] = out['MACD_Hist'] = nan
+        
+        # KDJ：单调队列求9日最高/最低价，K为RSV的3日均值，D为K的3日均值
+        while self.hi_deque and self.hi_deque[-1][1] <= high:
+            self.hi_deque.pop()
+        self.hi_deque.append((i, high))
+        while self.lo_deque and self.lo_deque[-1][1] >= low:
+            self.lo_deque.pop()
+        self.lo_deque.append((i, low))
+        if self.hi_deque[0][0] <= i - 9:
+            self.hi_deque.popleft()
+        if self.lo_deque[0][0] <= i - 9:
+            self.lo_deque.popleft()
+        if i >= 8:
+            hh = self.hi_deque[0][1]
+            ll = self.lo_deque[0][1]
+            self.rsv_buf.append((close - ll) / (hh - ll) * 100 if hh != ll else 0.0)
+        if i >= 10:
+            self.k_buf.append(sum(self.rsv_buf) / 3)
+        if i >= 12:
+            k = self.k_buf[-1]
+            d = sum(self.k_buf) / 3
+            out['K'] = k
+            out['D'] = d
+            out['J'] = 3 * k - 2 * d
+        else:
+            out['K'] = out['D'] = out['J'] = nan
+        
+        self.prev_close = close
+        self.count += 1
+        return out
+
+
+class AShareQuantUniverse:
+    def __init__(self, symbols, start_date=None, end_date=None,
+                 cache_max_age=timedelta(hours=1), max_workers=8):
+        """
+        多只A股的批量指标计算
+        收盘/最高/最低价按 (股票数, 交易日) 堆叠，有 CuPy 和 CUDA 设备时在 GPU 上
+        按股票并行计算，否则逐只股票回退到 CPU Numba 路径
+        :param symbols: A股代码列表
+        :param start_date: 开始日期
+        :param end_date: 结束日期
+        :param cache_max_age: 行情缓存的有效期（前复权数据即使是历史区间也按该有效期重新获取）
+        :param max_workers: 并发下载的线程数
+        """
+        self.strategies = {
+            symbol: AShareQuantStrategy(symbol, start_date, end_date, cache_max_age)
+            for symbol in symbols
+        }
+        self.max_workers = max_workers
+        self.prices = None
+        self.indicators = None
+        self.use_gpu = _gpu_available()
+    
+    def fetch_data(self):
+        """并发获取全部股票数据，并按交易日对齐"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            fetched = list(executor.map(lambda s: s.fetch_data(), self.strategies.values()))
+        
+        frames = {
+            symbol: strategy.data[['Close', 'High', 'Low']]
+            for (symbol, strategy), ok in zip(self.strategies.items(), fetched) if ok
+        }
+        if not frames:
+            print("没有获取到任何股票数据")
+            return False
+        
+        # 停牌日沿用前一交易日价格；上市前的日期保持 NaN，指标从各自第一根K线起算
+        self.prices = pd.concat(frames, axis=1).sort_index().ffill()
+        print(f"成功对齐 {len(frames)} 只股票 {len(self.prices)} 个交易日")
+        return True
+    
+    def calculate_indicators(self):
+        """批量计算技术指标，结果为 {列名: (股票数, 交易日) 数组}"""
+        if self.prices is None:
+            print("请先获取数据")
+            return
+        
+        symbols = self.prices.columns.get_level_values(0).unique()
+        # (股票数, 3, 交易日)：每只股票的最高/最低/收盘价各占一行
+        hlc = np.ascontiguousarray(np.stack([
+            self.prices.xs(field, axis=1, level=1)[symbols].to_numpy(dtype=np.float32).T
+            for field in ('High', 'Low', 'Close')
+        ], axis=1))
+        
+        # 每只股票第一根有效K线的位置，之前是上市前的空白
+        start = np.argmax(~np.isnan(hlc[:, 2]), axis=1)
+        
+        if self.use_gpu:
+            high, low, close = (cp.asarray(hlc[:, j]) for j in range(3))
+            self.indicators = _batch_indicators_gpu(close, high, low, start)
+        else:
+            n = hlc.shape[2]
+            self.indicators = {}
+            for i, (row, first) in enumerate(zip(hlc, start)):
+                values = _compute_indicators(np.ascontiguousarray(row[:, first:]))
+                for name, series in values.items():
+                    out = self.indicators.setdefault(name, np.full((len(hlc), n), np.nan, dtype=np.float32))
+                    out[i, first:] = series
+        print(f"{len(symbols)} 只股票技术指标计算完成（{'GPU' if self.use_gpu else 'CPU'}）")
+    
+    def to_frame(self):
+        """把指标拷回内存并转为 (股票代码, 指标) 两级列索引的 DataFrame，供绘图和查看"""
+        if self.indicators is None:
+            return None
+        
+        symbols = self.prices.columns.get_level_values(0).unique()
+        frames = {
+            name: pd.DataFrame((cp.asnumpy(values) if self.use_gpu else values).T,
+                               index=self.prices.index, columns=symbols)
+            for name, values in self.indicators.items()
+        }
+        return pd.concat(frames, axis=1).swaplevel(axis=1).sort_index(axis=1)
+
+
 def main():
     """主函数 - 运行A股Demo"""
     print("=== A股量化分析Demo ===")
@@ -266,19 +1108,23 @@ def main():
     # 默认分析贵州茅台
     symbol = '600519'  # 可以修改为其他股票代码
     
-    # 创建策略实例
-    strategy = AShareQuantStrategy(
-        symbol=symbol,
-        start_date='2023-01-01'
-    )
+    # 并发获取热门股票和所选股票（网络IO密集），指标计算与绘图保持串行
+    strategies = {
+        code: AShareQuantStrategy(symbol=code, start_date='2023-01-01')
+        for code in dict.fromkeys([*popular_stocks, symbol])
+    }
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        fetched = dict(zip(strategies, executor.map(lambda s: s.fetch_data(), strategies.values())))
     
-    # 运行分析
-    results = strategy.run_analysis()
+    # 无界面模式下每只股票保存一张图，否则只弹窗显示所选股票
+    for code, strategy in strategies.items():
+        if fetched[code]:
+            strategy.analyze(plot=HEADLESS or code == symbol)
     
-    if results is not None:
+    if fetched[symbol]:
         print(f"\n=== 最近5天数据 ===")
         columns_to_show = ['Close', 'MA5', 'MA20', 'RSI', 'Change_pct']
-        print(results[columns_to_show].tail())
+        print(strategies[symbol].data[columns_to_show].tail())
 
 
 if __name__ == "__main__":